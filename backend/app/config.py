@@ -1,8 +1,31 @@
 # app/config.py
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
 import os
 
-load_dotenv()
+def _find_env_file() -> Optional[Path]:
+    # Same search as dotenv's default: this package's directory, then its parents
+    here = Path(__file__).resolve().parent
+    for directory in (here, *here.parents):
+        candidate = directory / ".env"
+        if candidate.is_file():
+            return candidate
+    return None
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
+# Serverless platforms inject env vars directly; only read .env for local dev.
+if not (os.getenv("VERCEL") or os.getenv("PRODUCTION")):
+    _env_file = _find_env_file()
+    if _env_file is not None:
+        from dotenv import load_dotenv
+        load_dotenv(_env_file)
+
+@dataclass(frozen=True)
+class Settings:
+    OPENAI_API_KEY: Optional[str]
+    FRONTEND_ORIGIN: str
+
+settings = Settings(
+    OPENAI_API_KEY=os.getenv("OPENAI_API_KEY"),
+    FRONTEND_ORIGIN=os.getenv("FRONTEND_ORIGIN", "http://localhost:5173"),
+)
@@ -1,10 +1,12 @@
 # app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from app.routes import syllabus
-from app.config import FRONTEND_ORIGIN
+from app.config import settings
 
-app = FastAPI(title="Syllabus Parser API")
+app = FastAPI(title="Syllabus Parser API", default_response_class=ORJSONResponse)
 
 allowed_origins = [
     "http://localhost:5173",
@@ -13,24 +15,26 @@ allowed_origins = [
     "*"  # Temporarily allow all origins for debugging
 ]
 
-if FRONTEND_ORIGIN and FRONTEND_ORIGIN not in allowed_origins:
-    allowed_origins.append(FRONTEND_ORIGIN)
+if settings.FRONTEND_ORIGIN and settings.FRONTEND_ORIGIN not in allowed_origins:
+    allowed_origins.append(settings.FRONTEND_ORIGIN)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Temporarily allow all
-    allow_origin_regex=r"^https://syllabus-parser.*\.vercel\.app$",
+    allow_origin_regex=r"^https://syllabus-parser-[a-z0-9-]+\.vercel\.app$",
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=False,  # Changed to False when using "*"
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 @app.get("/")
 async def root():
-    return {"message": "Syllabus Parser API", "endpoints": ["/health", "/parse-syllabus"]}
+    return {"message": "Syllabus Parser API", "endpoints": ["/health", "/parse-syllabus", "/parse-syllabi"]}
 
-@app.get("/health")
+@app.get("/health", response_class=PlainTextResponse)
 def health():
-    return {"status": "ok"}
+    return "ok"
 
 app.include_router(syllabus.router)
@@ -1,6 +1,7 @@
 # app/routes/syllabus.py
+from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.syllabus_parser import parse_syllabus_from_pdf
+from app.services.syllabus_parser import parse_syllabus_from_pdf, parse_many
 from app.models import ParseResult
 
 router = APIRouter()
@@ -9,9 +10,18 @@ router = APIRouter()
 async def parse_syllabus_pdf(file: UploadFile = File(...)):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
-    pdf_bytes = await file.read()
-    return parse_syllabus_from_pdf(pdf_bytes)
+    # Hand the spooled upload to the parser instead of copying it into memory
+    await file.seek(0)
+    return await parse_syllabus_from_pdf(file.file)
 
 @router.post("/upload", response_model=ParseResult)
 async def upload_alias(file: UploadFile = File(...)):
     return await parse_syllabus_pdf(file)
+
+@router.post("/parse-syllabi", response_model=List[ParseResult])
+async def parse_syllabi_pdfs(files: List[UploadFile] = File(...)):
+    if any(f.content_type != "application/pdf" for f in files):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    for f in files:
+        await f.seek(0)
+    return await parse_many([f.file for f in files])
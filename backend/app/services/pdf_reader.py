@@ -1,16 +1,67 @@
 # app/services/pdf_reader.py
+import threading
+from functools import lru_cache
 from io import BytesIO
-from typing import Optional
-from pypdf import PdfReader
-from fastapi import UploadFile
+from typing import BinaryIO, Optional, Union
 
-def extract_text_from_pdf(data: bytes, max_pages: Optional[int] = None) -> str:
-    reader = PdfReader(BytesIO(data))
+@lru_cache(maxsize=1)
+def _load_pdfium():
+    """Import native PDFium bindings on first use; None when the wheel isn't installed."""
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+    return pypdfium2
+
+# PDFium is not thread-safe, and extraction runs in worker threads that can
+# overlap when several syllabi are parsed at once
+_PDFIUM_LOCK = threading.Lock()
+
+def _iter_page_texts_pdfium(pdfium, data: Union[bytes, BinaryIO], max_pages: Optional[int]):
+    pdf = pdfium.PdfDocument(data)
+    try:
+        total = len(pdf)
+        limit = min(total, max_pages) if max_pages else total
+        for i in range(limit):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                # PDFium already joins words hyphenated across lines and marks each
+                # join with \x02; drop the marker so control chars don't reach prompts
+                yield textpage.get_text_bounded().replace("\x02", "")
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def _iter_page_texts_pypdf(data: Union[bytes, BinaryIO], max_pages: Optional[int]):
+    from pypdf import PdfReader
+    reader = PdfReader(BytesIO(data) if isinstance(data, bytes) else data)
     total = len(reader.pages)
     limit = min(total, max_pages) if max_pages else total
-    parts = []
     for i in range(limit):
-        page = reader.pages[i]
-        text = page.extract_text() or ""
-        parts.append(text.strip())
+        yield reader.pages[i].extract_text()
+
+def _join_pages(pages, max_chars: Optional[int]) -> str:
+    parts = []
+    total_chars = 0
+    try:
+        for text in pages:
+            text = (text or "").strip()
+            parts.append(text)
+            # Stop once the caller's budget is met; later pages would be truncated anyway
+            total_chars += len(text) + 2
+            if max_chars and total_chars >= max_chars:
+                break
+    finally:
+        pages.close()
     return "\n\n".join(parts).strip()
+
+def extract_text_from_pdf(data: Union[bytes, BinaryIO], max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """Extract page text from PDF bytes or a seekable binary stream (e.g. a spooled upload)."""
+    pdfium = _load_pdfium()
+    if pdfium is None:
+        return _join_pages(_iter_page_texts_pypdf(data, max_pages), max_chars)
+    with _PDFIUM_LOCK:
+        return _join_pages(_iter_page_texts_pdfium(pdfium, data, max_pages), max_chars)
@@ -1,29 +1,34 @@
+import asyncio
+import hashlib
+import json
 import re
-from datetime import datetime
-from typing import Optional
-from pypdf import PdfReader
-from io import BytesIO
+from collections import OrderedDict
+from typing import BinaryIO, Optional, Union
 from app.models import ParseResult, Event, Assessment
-from openai import OpenAI
-from pydantic import BaseModel, Field
-from app.config import OPENAI_API_KEY
+from app.services.pdf_reader import extract_text_from_pdf
+from pydantic import BaseModel, ConfigDict, Field
+from app.config import settings
 
-# Use pydantic v2 (standard BaseModel)
+# Use pydantic v2 (standard BaseModel); extra="forbid" and no defaults keep the
+# generated schema valid for OpenAI strict structured output
 class LcEvent(BaseModel):
     """Event with title and date."""
+    model_config = ConfigDict(extra="forbid")
     title: str = Field(description="Event name (e.g., 'Assignment 1', 'Midterm Exam')")
     date: str = Field(description="Date in YYYY-MM-DD format")
 
 class LcAssessment(BaseModel):
     """Assessment category with weight."""
+    model_config = ConfigDict(extra="forbid")
     name: str = Field(description="Assessment category name (e.g., 'Assignments (5)', 'Final Exam')")
     weight: int = Field(description="Percentage weight (0-100)")
 
 class LcSyllabus(BaseModel):
     """Parsed syllabus structure."""
+    model_config = ConfigDict(extra="forbid")
     summary: str = Field(description="2-4 sentence course overview")
-    events: list[LcEvent] = Field(default_factory=list, description="Individual deadlines with specific dates")
-    evaluations: list[LcAssessment] = Field(default_factory=list, description="Assessment categories with weights that sum to 100")
+    events: list[LcEvent] = Field(description="Individual deadlines with specific dates")
+    evaluations: list[LcAssessment] = Field(description="Assessment categories with weights that sum to 100")
 
 SYSTEM = (
     "You are an expert at parsing university course syllabi. Extract the following information:\n\n"
@@ -53,13 +58,118 @@ SYSTEM = (
     "Be precise and only extract information that is clearly stated in the syllabus."
 )
 
-def parse_syllabus_from_pdf(file_bytes: bytes) -> ParseResult:
-    """Parse syllabus PDF using AI extraction."""
-    
-    # Extract text from PDF
+# Strict JSON-schema response format, built once instead of on every request
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "LcSyllabus",
+        "schema": LcSyllabus.model_json_schema(),
+        "strict": True,
+    },
+}
+
+MODEL = "gpt-4o-mini"
+
+# Upper bound on syllabus text sent to the model
+MAX_MODEL_CHARS = 30000
+# Syllabus content sits up front; later pages of course packs are readings/appendices
+MAX_PDF_PAGES = 12
+
+# Layout whitespace from PDF extraction costs tokens without helping the model
+_CR_RE = re.compile(r"\r\n?")
+# Rejoin only letter-letter wraps ("Pro-\ngramming"); digit ranges and dates keep their break
+_HYPHEN_NL_RE = re.compile(r"(?<=[^\W\d_])-\n(?=[^\W\d_])")
+_MULTI_SPACE_RE = re.compile(r"[ \t\f\v]+")
+_TRAILING_WS_RE = re.compile(r" ?\n ?")
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+
+def _clean_text(s: str) -> str:
+    s = _CR_RE.sub("\n", s)
+    s = _HYPHEN_NL_RE.sub("", s)
+    s = _MULTI_SPACE_RE.sub(" ", s)
+    s = _TRAILING_WS_RE.sub("\n", s)
+    s = _MULTI_NL_RE.sub("\n\n", s)
+    return s.strip()
+
+def _new_client():
+    """Build an AsyncOpenAI client, or None when no API key is configured.
+
+    openai is imported on first use so cold starts serving /health don't pay for it.
+    """
+    if not settings.OPENAI_API_KEY:
+        return None
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    # HTTP/2 multiplexes concurrent parses over one kept-alive connection
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        http_client=DefaultAsyncHttpxClient(http2=True),
+    )
+
+# Pooled connections are bound to the event loop that opened them, so the shared
+# client is rebuilt whenever a new loop shows up (Vercel's per-request shim,
+# repeated asyncio.run calls)
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client = None
+
+def _get_client():
+    """Shared client so the connection pool is reused across requests on the running loop."""
+    global _client_loop, _client
+    loop = asyncio.get_running_loop()
+    if _client_loop is not loop:
+        _client_loop, _client = loop, _new_client()
+    return _client
+
+# Recently parsed syllabi keyed by content hash, so re-uploads skip the model call
+MAX_CACHED_RESULTS = 128
+_result_cache: "OrderedDict[str, ParseResult]" = OrderedDict()
+
+def _cache_key(pdf: Union[bytes, BinaryIO], max_pages: Optional[int]) -> str:
+    # The page cap changes the extracted text, so it is part of the key
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(pdf, bytes):
+        digest.update(pdf)
+    else:
+        # Hash spooled uploads in chunks rather than materializing them
+        pdf.seek(0)
+        for chunk in iter(lambda: pdf.read(1 << 20), b""):
+            digest.update(chunk)
+        pdf.seek(0)
+    return f"{digest.hexdigest()}:{max_pages}"
+
+def _cache_get(key: str) -> Optional[ParseResult]:
+    result = _result_cache.get(key)
+    if result is not None:
+        _result_cache.move_to_end(key)
+    return result
+
+def _cache_put(key: str, result: ParseResult) -> None:
+    _result_cache[key] = result
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > MAX_CACHED_RESULTS:
+        _result_cache.popitem(last=False)
+
+def _build_request(text: str) -> dict:
+    """Chat completion arguments shared by the interactive and batch paths."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": f"Parse this syllabus:\n\n{text[:MAX_MODEL_CHARS]}"}
+        ],
+        "response_format": RESPONSE_FORMAT,
+        "temperature": 0,
+    }
+
+async def _read_syllabus_text(
+    pdf: Union[bytes, BinaryIO], max_pages: Optional[int] = MAX_PDF_PAGES
+) -> Union[str, ParseResult]:
+    """Extract and clean syllabus text, or return the error result to report."""
+    # Extract text from PDF (CPU-bound, keep it off the event loop)
     try:
-        reader = PdfReader(BytesIO(file_bytes))
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        text = await asyncio.to_thread(
+            extract_text_from_pdf, pdf, max_pages=max_pages, max_chars=MAX_MODEL_CHARS
+        )
+        text = _clean_text(text)
     except Exception as e:
         return ParseResult(
             summary=f"Error reading PDF: {str(e)}",
@@ -73,56 +183,80 @@ def parse_syllabus_from_pdf(file_bytes: bytes) -> ParseResult:
             events=[],
             evaluations=[]
         )
+    return text
 
-    # Use AI to parse the syllabus
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM},
-                {"role": "user", "content": f"Parse this syllabus:\n\n{text}"}
-            ],
-            response_format=LcSyllabus,
-            temperature=0
-        )
-        
-        result = completion.choices[0].message.parsed
-        
-        # Convert to our models
-        events = [Event(title=e.title, date=e.date) for e in result.events]
-        evaluations = [Assessment(name=a.name, weight=a.weight) for a in result.evaluations]
+def _to_parse_result(content: Optional[str], refusal: Optional[str] = None) -> ParseResult:
+    """Validate the model's JSON reply and convert it to our models."""
+    if refusal:
+        raise ValueError(f"Model refused: {refusal}")
+    result = LcSyllabus.model_validate_json(content or "")
+    
+    # Convert to our models
+    events = [Event(title=e.title, date=e.date) for e in result.events]
+    evaluations = [Assessment(name=a.name, weight=a.weight) for a in result.evaluations]
+    
+    # Post-process evaluations to ensure weights sum to exactly 100
+    if evaluations:
+        total = sum(a.weight for a in evaluations)
         
-        # Post-process evaluations to ensure weights sum to exactly 100
-        if evaluations:
-            total = sum(a.weight for a in evaluations)
+        if total == 0:
+            evaluations = []
+        elif total != 100:
+            # Normalize weights proportionally, tracking the running sum and
+            # largest entry in the same pass
+            normalized_evaluations = []
+            current_sum = 0
+            largest = None
+            for a in evaluations:
+                normalized_weight = round((a.weight / total) * 100)
+                if normalized_weight > 0:
+                    normalized = Assessment(name=a.name, weight=normalized_weight)
+                    normalized_evaluations.append(normalized)
+                    current_sum += normalized_weight
+                    if largest is None or normalized_weight > largest.weight:
+                        largest = normalized
             
-            if total == 0:
-                evaluations = []
-            elif total != 100:
-                # Normalize weights proportionally
-                normalized_evaluations = []
-                for a in evaluations:
-                    normalized_weight = round((a.weight / total) * 100)
-                    if normalized_weight > 0:
-                        normalized_evaluations.append(Assessment(name=a.name, weight=normalized_weight))
-                
-                evaluations = normalized_evaluations
-                
-                # Fix rounding errors to ensure exactly 100%
-                current_sum = sum(a.weight for a in evaluations)
-                diff = 100 - current_sum
-                
-                if diff != 0 and evaluations:
-                    largest = max(evaluations, key=lambda a: a.weight)
-                    largest.weight += diff
-        
+            evaluations = normalized_evaluations
+            
+            # Fix rounding errors to ensure exactly 100%
+            if largest is not None:
+                largest.weight += 100 - current_sum
+    
+    return ParseResult(
+        summary=result.summary or "No summary available",
+        events=events,
+        evaluations=evaluations
+    )
+
+async def parse_syllabus_from_pdf(
+    pdf: Union[bytes, BinaryIO], max_pages: Optional[int] = MAX_PDF_PAGES
+) -> ParseResult:
+    """Parse syllabus PDF (bytes or a seekable stream) using AI extraction."""
+    
+    cache_key = await asyncio.to_thread(_cache_key, pdf, max_pages)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    text = await _read_syllabus_text(pdf, max_pages)
+    if isinstance(text, ParseResult):
+        return text
+
+    client = _get_client()
+    if client is None:
         return ParseResult(
-            summary=result.summary or "No summary available",
-            events=events,
-            evaluations=evaluations
+            summary="AI parsing failed: OPENAI_API_KEY is not set",
+            events=[],
+            evaluations=[]
         )
+
+    # Use AI to parse the syllabus
+    try:
+        completion = await client.chat.completions.create(**_build_request(text))
+        message = completion.choices[0].message
+        parsed = _to_parse_result(message.content, message.refusal)
+        _cache_put(cache_key, parsed)
+        return parsed
         
     except Exception as e:
         print(f"AI parsing error: {str(e)}")
@@ -130,4 +264,132 @@ def parse_syllabus_from_pdf(file_bytes: bytes) -> ParseResult:
             summary=f"AI parsing failed: {str(e)}",
             events=[],
             evaluations=[]
-        )
\ No newline at end of file
+        )
+
+# Model calls allowed in flight when parsing several syllabi at once
+MAX_CONCURRENT_PARSES = 8
+
+async def parse_many(
+    pdfs: list[Union[bytes, BinaryIO]], limit: int = MAX_CONCURRENT_PARSES
+) -> list[ParseResult]:
+    """Parse several syllabi concurrently; results keep the order of ``pdfs``."""
+    sem = asyncio.Semaphore(limit)
+
+    async def parse_one(pdf: Union[bytes, BinaryIO]) -> ParseResult:
+        async with sem:
+            return await parse_syllabus_from_pdf(pdf)
+
+    return await asyncio.gather(*(parse_one(pdf) for pdf in pdfs))
+
+# Poll interval and terminal states for OpenAI batch jobs
+BATCH_POLL_SECONDS = 30
+_BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Consecutive transient errors tolerated while polling before giving up on a batch
+BATCH_POLL_MAX_ERRORS = 10
+
+def _batch_error_message(item: dict) -> str:
+    """Best available error text for a failed batch request line."""
+    response = item.get("response") or {}
+    error = item.get("error") or (response.get("body") or {}).get("error")
+    if isinstance(error, dict):
+        return error.get("message") or error.get("code") or str(error)
+    return str(error) if error else f"HTTP {response.get('status_code')}"
+
+async def parse_syllabi_batch(
+    pdfs: list[Union[bytes, BinaryIO]], poll_interval: float = BATCH_POLL_SECONDS
+) -> list[ParseResult]:
+    """Parse many syllabi through the OpenAI Batch API.
+
+    Batch jobs cost about half as much as interactive calls but can take up to
+    24h to finish, so this is meant for bulk imports; uploads keep using
+    parse_syllabus_from_pdf. Results are returned in the same order as ``pdfs``.
+    """
+    results: list[Optional[ParseResult]] = [None] * len(pdfs)
+    cache_keys = []
+    lines = []
+    for i, pdf in enumerate(pdfs):
+        cache_key = await asyncio.to_thread(_cache_key, pdf, MAX_PDF_PAGES)
+        cache_keys.append(cache_key)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        text = await _read_syllabus_text(pdf)
+        if isinstance(text, ParseResult):
+            results[i] = text
+            continue
+        lines.append(json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _build_request(text),
+        }))
+
+    failure = "AI parsing failed: no result returned"
+    client = _new_client() if lines else None
+    if lines and client is None:
+        failure = "AI parsing failed: OPENAI_API_KEY is not set"
+    elif lines:
+        # A dedicated client, closed when the job is done, so repeated
+        # asyncio.run(parse_syllabi_batch(...)) calls never share a dead pool
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+
+        batch_id = None
+        async with client:
+            try:
+                batch_file = await client.files.create(
+                    file=("syllabi.jsonl", "\n".join(lines).encode()), purpose="batch"
+                )
+                batch = await client.batches.create(
+                    input_file_id=batch_file.id,
+                    endpoint="/v1/chat/completions",
+                    completion_window="24h",
+                )
+                batch_id = batch.id
+                errors = 0
+                while batch.status not in _BATCH_FINAL_STATUSES:
+                    await asyncio.sleep(poll_interval)
+                    try:
+                        batch = await client.batches.retrieve(batch_id)
+                        errors = 0
+                    except (APIConnectionError, InternalServerError, RateLimitError) as e:
+                        # The job keeps running server-side; a blip here must not lose it
+                        errors += 1
+                        if errors >= BATCH_POLL_MAX_ERRORS:
+                            raise
+                        print(f"AI batch {batch_id} poll error, retrying: {str(e)}")
+                if batch.status != "completed":
+                    raise RuntimeError(f"batch {batch.id} ended with status {batch.status}")
+
+                # Successful requests land in the output file and failed ones in the
+                # error file; either may be missing when every request went one way
+                for file_id in (batch.output_file_id, batch.error_file_id):
+                    if not file_id:
+                        continue
+                    content = await client.files.content(file_id)
+                    for line in content.text.splitlines():
+                        item = json.loads(line)
+                        i = int(item["custom_id"])
+                        try:
+                            response = item.get("response") or {}
+                            if response.get("status_code") != 200:
+                                raise ValueError(_batch_error_message(item))
+                            message = response["body"]["choices"][0]["message"]
+                            results[i] = _to_parse_result(message.get("content"), message.get("refusal"))
+                            _cache_put(cache_keys[i], results[i])
+                        except Exception as e:
+                            results[i] = ParseResult(
+                                summary=f"AI parsing failed: {str(e)}",
+                                events=[],
+                                evaluations=[]
+                            )
+            except Exception as e:
+                # Keep the batch id so finished results can still be fetched later
+                where = f" (batch {batch_id})" if batch_id else ""
+                print(f"AI batch parsing error{where}: {str(e)}")
+                failure = f"AI parsing failed{where}: {str(e)}"
+
+    return [
+        r if r is not None else ParseResult(summary=failure, events=[], evaluations=[])
+        for r in results
+    ]